@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark for compressed chunk storage on a single large tenant
+Builds a SQLite database in the pre-compression schema, measures the old
+/ask and contract detail query patterns, migrates it with create_tables()
+and backfill_chunks(), then measures the current endpoints on the same data.
+
+Usage: python benchmark_chunks.py [--chunks 100000] [--documents 1000] [--chunk-chars 0]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from sqlalchemy import create_engine, Column, Text
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.dialects.postgresql import UUID
+
+from text_storage import make_snippet, detect_insights
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "sample-contracts"
+
+LEGACY_SCHEMA = """
+CREATE TABLE users (user_id UUID PRIMARY KEY, username VARCHAR NOT NULL, password_hash VARCHAR NOT NULL, created_at DATETIME);
+CREATE TABLE documents (doc_id UUID PRIMARY KEY, user_id UUID NOT NULL, filename VARCHAR NOT NULL, uploaded_on DATETIME,
+    expiry_date DATETIME, status VARCHAR, risk_score VARCHAR, contract_name VARCHAR, parties VARCHAR);
+CREATE TABLE chunks (chunk_id UUID PRIMARY KEY, doc_id UUID NOT NULL, user_id UUID NOT NULL,
+    text_chunk TEXT NOT NULL, embedding TEXT, chunk_metadata TEXT);
+"""
+
+LegacyBase = declarative_base()
+
+class LegacyChunk(LegacyBase):
+    """The chunks table as the endpoints loaded it before compression"""
+    __tablename__ = "chunks"
+
+    chunk_id = Column(UUID(as_uuid=True), primary_key=True)
+    doc_id = Column(UUID(as_uuid=True))
+    user_id = Column(UUID(as_uuid=True))
+    text_chunk = Column(Text)
+    embedding = Column(Text)
+    chunk_metadata = Column(Text)
+
+def new_id():
+    # UUID columns have NUMERIC affinity in SQLite, so skip ids like "1234e567..."
+    while True:
+        value = uuid.uuid4().hex
+        if not re.fullmatch(r"\d*e?\d*", value):
+            return value
+
+def load_sections():
+    sections = []
+    for path in sorted(SAMPLE_DIR.glob("*.txt")):
+        sections.extend(section.strip() for section in path.read_text().split("\n\n") if section.strip())
+    return sections
+
+def build_legacy_database(path, chunk_count, document_count, chunk_chars):
+    rng = random.Random(0)
+    sections = load_sections()
+    user_id = new_id()
+    doc_ids = [new_id() for _ in range(document_count)]
+
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO users VALUES (?, 'tenant', 'x', NULL)", (user_id,))
+    conn.executemany(
+        "INSERT INTO documents (doc_id, user_id, filename, contract_name, status, risk_score, uploaded_on) "
+        "VALUES (?, ?, ?, ?, 'Active', 'Medium', '2025-01-01 00:00:00.000000')",
+        [(doc_id, user_id, f"contract-{i}.txt", f"contract-{i}.txt") for i, doc_id in enumerate(doc_ids)]
+    )
+    rows = []
+    for i in range(chunk_count):
+        doc_index = i % document_count
+        # One contract section per chunk, or consecutive sections up to chunk_chars
+        parts = [sections[i % len(sections)]]
+        while sum(len(part) for part in parts) < chunk_chars:
+            parts.append(sections[(i + len(parts)) % len(sections)])
+        # Vary numbers so identical sections do not repeat byte for byte
+        text_chunk = "\n\n".join(parts).replace("30", str(rng.randint(10, 99)))
+        embedding = [round(rng.uniform(-1, 1), 2) for _ in range(4)]
+        metadata = {"page": i // document_count + 1, "contract_name": f"contract-{doc_index}.txt"}
+        rows.append((new_id(), doc_ids[doc_index], user_id, text_chunk, json.dumps(embedding), json.dumps(metadata)))
+    conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return user_id, doc_ids
+
+def legacy_ask(db, user_id):
+    query_embedding = np.array([0.1, 0.3, 0.5, 0.2])
+    chunks = db.query(LegacyChunk).filter(LegacyChunk.user_id == user_id).all()
+    chunk_scores = []
+    for chunk in chunks:
+        chunk_embedding = np.array(json.loads(chunk.embedding))
+        similarity = cosine_similarity([query_embedding], [chunk_embedding])[0][0]
+        chunk_scores.append((chunk, similarity))
+    chunk_scores.sort(key=lambda x: x[1], reverse=True)
+    return [
+        {"text": chunk.text_chunk, "metadata": json.loads(chunk.chunk_metadata), "relevance_score": round(score * 100, 1)}
+        for chunk, score in chunk_scores[:3]
+    ]
+
+def legacy_detail(db, user_id, doc_id):
+    chunks = db.query(LegacyChunk).filter(LegacyChunk.doc_id == doc_id, LegacyChunk.user_id == user_id).all()
+    all_text = " ".join([chunk.text_chunk for chunk in chunks])
+    return {
+        "clauses": [make_snippet(chunk.text_chunk, 150) for chunk in chunks[:5]],
+        "insights": detect_insights(all_text),
+        "evidence": [make_snippet(chunk.text_chunk) for chunk in chunks[:4]],
+    }
+
+def measure(func, repeats):
+    """Median wall time in ms and tracemalloc peak in MB"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024 / 1024
+
+def vacuumed_size(path):
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path) / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--chunk-chars", type=int, default=0, help="minimum chunk length, 0 for one section per chunk")
+    parser.add_argument("--ask-repeats", type=int, default=3)
+    parser.add_argument("--detail-repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="chunk-bench-"))
+    legacy_path = workdir / "legacy.db"
+    current_path = workdir / "current.db"
+    try:
+        print(f"Building {args.chunks} chunks across {args.documents} documents in {workdir}")
+        user_id, doc_ids = build_legacy_database(legacy_path, args.chunks, args.documents, args.chunk_chars)
+        user_id, doc_id = uuid.UUID(user_id), uuid.UUID(doc_ids[0])
+        shutil.copy(legacy_path, current_path)
+        legacy_size = vacuumed_size(legacy_path)
+
+        legacy_engine = create_engine(f"sqlite:///{legacy_path}")
+        legacy_db = sessionmaker(bind=legacy_engine)()
+        legacy_ask_ms, legacy_ask_mb = measure(lambda: legacy_ask(legacy_db, user_id), args.ask_repeats)
+        legacy_detail_ms, legacy_detail_mb = measure(lambda: legacy_detail(legacy_db, user_id, doc_id), args.detail_repeats)
+        legacy_db.close()
+        legacy_engine.dispose()
+
+        # database.py binds its engine at import time
+        os.environ["DATABASE_URL"] = f"sqlite:///{current_path}"
+        import database
+        from main import ask_question, get_contract_detail, QueryRequest
+
+        start = time.perf_counter()
+        database.create_tables()
+        database.backfill_chunks()
+        migrate_s = time.perf_counter() - start
+        database.engine.dispose()
+        current_size = vacuumed_size(current_path)
+
+        db = database.SessionLocal()
+        user = db.query(database.User).one()
+        query = QueryRequest(question="What are the termination terms?")
+        ask_ms, ask_mb = measure(lambda: asyncio.run(ask_question(query, current_user=user, db=db)), args.ask_repeats)
+        detail_ms, detail_mb = measure(
+            lambda: asyncio.run(get_contract_detail(doc_id, current_user=user, db=db)), args.detail_repeats
+        )
+        db.close()
+
+        print(f"\nMigration + backfill: {migrate_s:.1f} s")
+        print(f"\n{'':<24}{'before':>12}{'after':>12}{'change':>10}")
+        for label, before, after in [
+            ("DB size (MB)", legacy_size, current_size),
+            ("/ask median (ms)", legacy_ask_ms, ask_ms),
+            ("/ask peak alloc (MB)", legacy_ask_mb, ask_mb),
+            ("detail median (ms)", legacy_detail_ms, detail_ms),
+            ("detail peak alloc (MB)", legacy_detail_mb, detail_mb),
+        ]:
+            print(f"{label:<24}{before:>12.2f}{after:>12.2f}{(after - before) / before:>+10.0%}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
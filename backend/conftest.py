@@ -0,0 +1,25 @@
+import pytest
+
+# Live-server scripts, run them directly against a running API
+collect_ignore = ["test_api.py", "test_server.py"]
+
+@pytest.fixture(scope="session")
+def database_module():
+    """database.py connects at import time, so import it against an in-memory database"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DATABASE_URL", "sqlite://")
+        import database
+    return database
+
+@pytest.fixture
+def sqlite_database(database_module, tmp_path, monkeypatch):
+    """Point the database module at an empty SQLite file for one test"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    path = tmp_path / "contracts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    monkeypatch.setattr(database_module, "engine", engine)
+    monkeypatch.setattr(database_module, "SessionLocal", sessionmaker(bind=engine))
+    yield path
+    engine.dispose()
@@ -1,13 +1,16 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, ForeignKey, text
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, ForeignKey, LargeBinary, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.schema import CreateTable
 # from pgvector.sqlalchemy import Vector
 # Using TEXT for embeddings instead of Vector for deployment compatibility
 import uuid
+import json
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from text_storage import SNIPPET_LENGTH, pack_chunk_text, chunk_row_text, detect_insights
 
 # Only load .env in development
 if os.getenv("ENVIRONMENT") != "production":
@@ -59,6 +62,7 @@ class Document(Base):
     risk_score = Column(String, default="Low")
     contract_name = Column(String)
     parties = Column(String)
+    insights = Column(Text)  # JSON string, computed at upload
     
     user = relationship("User", back_populates="documents")
     chunks = relationship("Chunk", back_populates="document")
@@ -69,7 +73,9 @@ class Chunk(Base):
     chunk_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     doc_id = Column(UUID(as_uuid=True), ForeignKey("documents.doc_id"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=False)
-    text_chunk = Column(Text, nullable=False)
+    text_chunk = Column(Text)  # Legacy plain-text storage, NULL for compressed rows
+    text_compressed = Column(LargeBinary)  # See text_storage.compress_text(), NULL if snippet holds the full text
+    snippet = Column(String(SNIPPET_LENGTH + 3))  # Precomputed display snippet
     embedding = Column(Text)  # Store embeddings as JSON string for compatibility
     chunk_metadata = Column(Text)  # JSON string
     
@@ -84,4 +90,86 @@ def get_db():
         db.close()
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    migrate_chunks()
+
+def migrate_chunks():
+    """Bring tables created before compressed chunk storage up to the current schema"""
+    inspector = inspect(engine)
+    chunk_columns = {column["name"]: column for column in inspector.get_columns("chunks")}
+    document_columns = {column["name"] for column in inspector.get_columns("documents")}
+    
+    with engine.begin() as conn:
+        if "insights" not in document_columns:
+            conn.execute(text("ALTER TABLE documents ADD COLUMN insights TEXT"))
+    
+    if engine.dialect.name == "sqlite":
+        if "chunks_legacy" in inspector.get_table_names() or not chunk_columns["text_chunk"]["nullable"]:
+            rebuild_sqlite_chunks()
+        return
+    
+    with engine.begin() as conn:
+        for column in Chunk.__table__.columns:
+            if column.name not in chunk_columns:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE chunks ADD COLUMN {column.name} {column_type}"))
+        if not chunk_columns["text_chunk"]["nullable"]:
+            conn.execute(text("ALTER TABLE chunks ALTER COLUMN text_chunk DROP NOT NULL"))
+
+def rebuild_sqlite_chunks():
+    """Rebuild chunks without NOT NULL on text_chunk, finishing any rebuild that was interrupted"""
+    raw = engine.raw_connection()
+    sqlite_conn = raw.driver_connection
+    isolation_level = sqlite_conn.isolation_level
+    # pysqlite does not wrap DDL in its implicit transactions, so manage BEGIN/COMMIT ourselves
+    sqlite_conn.isolation_level = None
+    cursor = sqlite_conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "chunks_legacy" not in tables:
+            cursor.execute("ALTER TABLE chunks RENAME TO chunks_legacy")
+            cursor.execute(str(CreateTable(Chunk.__table__).compile(dialect=engine.dialect)))
+        # Otherwise create_all() has already recreated chunks, possibly with new uploads in it
+        legacy_columns = {row[1] for row in cursor.execute("PRAGMA table_info(chunks_legacy)")}
+        shared = ", ".join(name for name in Chunk.__table__.columns.keys() if name in legacy_columns)
+        cursor.execute(f"INSERT OR IGNORE INTO chunks ({shared}) SELECT {shared} FROM chunks_legacy")
+        cursor.execute("DROP TABLE chunks_legacy")
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.close()
+        sqlite_conn.isolation_level = isolation_level
+        raw.close()
+
+def compute_document_insights(db, doc_id):
+    chunks = db.query(Chunk.text_chunk, Chunk.text_compressed, Chunk.snippet).filter(
+        Chunk.doc_id == doc_id
+    ).all()
+    return detect_insights(" ".join([chunk_row_text(chunk) for chunk in chunks]))
+
+def backfill_chunks(batch_size=1000):
+    """Compress legacy chunk text and compute missing document insights in batches"""
+    db = SessionLocal()
+    try:
+        # Insights first, while legacy text can still be read without decompressing
+        while True:
+            documents = db.query(Document).filter(Document.insights.is_(None)).limit(batch_size).all()
+            if not documents:
+                break
+            for document in documents:
+                document.insights = json.dumps(compute_document_insights(db, document.doc_id))
+            db.commit()
+        
+        while True:
+            chunks = db.query(Chunk).filter(Chunk.text_chunk.isnot(None)).limit(batch_size).all()
+            if not chunks:
+                break
+            for chunk in chunks:
+                chunk.text_compressed, chunk.snippet = pack_chunk_text(chunk.text_chunk)
+                chunk.text_chunk = None
+            db.commit()
+    finally:
+        db.close()
\ No newline at end of file
@@ -7,7 +7,7 @@ Creates tables and enables pgvector extension
 import os
 import sys
 from sqlalchemy import create_engine, text
-from database import Base, create_tables
+from database import Base, create_tables, backfill_chunks
 from dotenv import load_dotenv
 
 def init_database():
@@ -37,7 +37,11 @@ def init_database():
         
         # Create tables
         create_tables()
-        print("✓ Database tables created successfully")
+        print("✓ Database tables created and migrated successfully")
+        
+        # Compress legacy chunks now instead of in the background after server start
+        backfill_chunks()
+        print("✓ Chunk backfill complete")
         
         print("\n🎉 Database initialization complete!")
         print("You can now start the FastAPI server with: uvicorn main:app --reload")
@@ -11,8 +11,10 @@ from sklearn.metrics.pairwise import cosine_similarity
 import PyPDF2
 import docx
 import io
+import threading
 
-from database import get_db, create_tables, User, Document, Chunk
+from database import get_db, create_tables, backfill_chunks, compute_document_insights, User, Document, Chunk
+from text_storage import make_snippet, pack_chunk_text, chunk_row_text, chunk_row_snippet, detect_insights
 from auth import get_password_hash, verify_password, create_access_token, get_current_user
 from pydantic import BaseModel
 import os
@@ -91,14 +93,26 @@ def extract_text_from_file(file: UploadFile) -> str:
     else:
         return file.file.read().decode('utf-8')
 
+def run_backfill():
+    try:
+        backfill_chunks()
+        print("✓ Chunk backfill complete")
+    except Exception as e:
+        print(f"⚠ Chunk backfill failed: {e}")
+        print("Chunks that were not backfilled are still served from their legacy text")
+
 @app.on_event("startup")
 async def startup_event():
     try:
         create_tables()
-        print("✓ Database tables created successfully")
+        print("✓ Database tables created and migrated successfully")
     except Exception as e:
         print(f"⚠ Database connection failed: {e}")
         print("App will continue without database initialization")
+        return
+    
+    # Backfilling a large tenant takes minutes, so do not hold up startup for it
+    threading.Thread(target=run_backfill, daemon=True).start()
 
 @app.get("/health")
 async def health_check():
@@ -170,12 +184,18 @@ async def upload_file(
     # Mock LlamaCloud parsing
     parsed_data = mock_llamacloud_parse(file.filename, content)
     
+    # Insights need the full text, so compute them now rather than on every detail view
+    all_text = " ".join([chunk_data["text"] for chunk_data in parsed_data["chunks"]])
+    document.insights = json.dumps(detect_insights(all_text))
+    
     # Store chunks
     for chunk_data in parsed_data["chunks"]:
+        text_compressed, snippet = pack_chunk_text(chunk_data["text"])
         chunk = Chunk(
             doc_id=document.doc_id,
             user_id=current_user.user_id,
-            text_chunk=chunk_data["text"],
+            text_compressed=text_compressed,
+            snippet=snippet,
             embedding=json.dumps(chunk_data["embedding"]),  # Store as JSON string
             chunk_metadata=json.dumps(chunk_data["metadata"])
         )
@@ -218,24 +238,20 @@ async def get_contract_detail(
     if not document:
         raise HTTPException(status_code=404, detail="Contract not found")
     
-    chunks = db.query(Chunk).filter(
+    # Only snippets are needed here; insights were computed from the full text at upload
+    chunks = db.query(Chunk.snippet, Chunk.text_chunk, Chunk.chunk_metadata).filter(
         Chunk.doc_id == doc_id,
         Chunk.user_id == current_user.user_id
-    ).all()
-    
-    # Generate insights based on actual contract content
-    all_text = " ".join([chunk.text_chunk for chunk in chunks])
-    insights = []
+    ).limit(5).all()
+    snippets = [chunk_row_snippet(chunk) for chunk in chunks]
     
-    # Analyze actual content for insights
-    if "terminate" in all_text.lower():
-        insights.append({"type": "termination", "text": "Contract contains termination clauses - review notice periods"})
-    if "liability" in all_text.lower():
-        insights.append({"type": "liability", "text": "Liability limitations found - verify coverage adequacy"})
-    if "confidential" in all_text.lower():
-        insights.append({"type": "confidentiality", "text": "Confidentiality obligations present - ensure compliance"})
-    if "payment" in all_text.lower():
-        insights.append({"type": "payment", "text": "Payment terms specified - monitor due dates"})
+    if document.insights is None:
+        # Uploaded before insights were stored and not backfilled yet
+        insights = compute_document_insights(db, document.doc_id)
+        document.insights = json.dumps(insights)
+        db.commit()
+    else:
+        insights = json.loads(document.insights)
     
     return {
         "doc_id": str(document.doc_id),
@@ -248,19 +264,19 @@ async def get_contract_detail(
         "clauses": [
             {
                 "title": f"Section {i+1}",
-                "text": chunk.text_chunk[:150] + "..." if len(chunk.text_chunk) > 150 else chunk.text_chunk,
+                "text": make_snippet(snippet, 150),
                 "confidence": 85 + (i * 3) % 20
             }
-            for i, chunk in enumerate(chunks[:5])
+            for i, snippet in enumerate(snippets)
         ],
         "insights": insights,
         "evidence": [
             {
                 "source": f"Page {json.loads(chunk.chunk_metadata).get('page', 1)}",
-                "snippet": chunk.text_chunk[:200] + "..." if len(chunk.text_chunk) > 200 else chunk.text_chunk,
+                "snippet": snippet,
                 "relevance": 0.9 - (i * 0.1)
             }
-            for i, chunk in enumerate(chunks[:4])
+            for i, (chunk, snippet) in enumerate(zip(chunks[:4], snippets))
         ]
     }
 
@@ -273,8 +289,8 @@ async def ask_question(
     # Mock query embedding
     query_embedding = np.array([0.1, 0.3, 0.5, 0.2])
     
-    # Get all chunks for user
-    chunks = db.query(Chunk).filter(Chunk.user_id == current_user.user_id).all()
+    # Get ids and embeddings of all chunks for user; text is only loaded for the top hits
+    chunks = db.query(Chunk.chunk_id, Chunk.embedding).filter(Chunk.user_id == current_user.user_id).all()
     
     if not chunks:
         return {
@@ -290,17 +306,30 @@ async def ask_question(
             similarity = cosine_similarity([query_embedding], [chunk_embedding])[0][0]
         except:
             similarity = 0.5  # Default similarity if parsing fails
-        chunk_scores.append((chunk, similarity))
+        chunk_scores.append((chunk.chunk_id, similarity))
     
     # Sort by similarity and get top 3
     chunk_scores.sort(key=lambda x: x[1], reverse=True)
-    top_chunks = chunk_scores[:3]
+    top_scores = chunk_scores[:3]
+    top_rows = db.query(
+        Chunk.chunk_id,
+        Chunk.text_chunk,
+        Chunk.text_compressed,
+        Chunk.snippet,
+        Chunk.chunk_metadata
+    ).filter(
+        Chunk.chunk_id.in_([chunk_id for chunk_id, _ in top_scores]),
+        Chunk.user_id == current_user.user_id
+    ).all()
+    rows_by_id = {row.chunk_id: row for row in top_rows}
+    # Skip chunks deleted since scoring
+    top_chunks = [(rows_by_id[chunk_id], score) for chunk_id, score in top_scores if chunk_id in rows_by_id]
     
     return {
         "answer": f"Based on your contracts, here's what I found regarding '{query.question}': The most relevant clauses indicate specific terms and conditions that apply to your situation.",
         "chunks": [
             {
-                "text": chunk.text_chunk,
+                "text": chunk_row_text(chunk),
                 "metadata": json.loads(chunk.chunk_metadata),
                 "relevance_score": round(score * 100, 1)
             }
@@ -0,0 +1,182 @@
+"""
+Tests for compressed chunk storage and the chunks table migration
+Run with: python -m pytest test_chunk_storage.py
+"""
+
+import asyncio
+import json
+import sqlite3
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import inspect
+
+from text_storage import (
+    CHUNK_ZDICTS, CURRENT_DICT_ID, compress_text, decompress_text, make_snippet, pack_chunk_text, chunk_row_text,
+    chunk_row_snippet, detect_insights
+)
+
+LEGACY_SCHEMA = """
+CREATE TABLE users (user_id UUID PRIMARY KEY, username VARCHAR NOT NULL, password_hash VARCHAR NOT NULL, created_at DATETIME);
+CREATE TABLE documents (doc_id UUID PRIMARY KEY, user_id UUID NOT NULL, filename VARCHAR NOT NULL, uploaded_on DATETIME,
+    expiry_date DATETIME, status VARCHAR, risk_score VARCHAR, contract_name VARCHAR, parties VARCHAR);
+CREATE TABLE chunks (chunk_id UUID PRIMARY KEY, doc_id UUID NOT NULL, user_id UUID NOT NULL,
+    text_chunk TEXT NOT NULL, embedding TEXT, chunk_metadata TEXT);
+"""
+
+@pytest.mark.parametrize("value", [
+    "",
+    "Short clause.",
+    "Either party may terminate this Agreement upon sixty (60) days written notice. " * 20,
+    "Prix: 1 000 € — délai de paiement 30 jours",
+])
+def test_compress_round_trip(value):
+    data = compress_text(value)
+    assert data[0] == CURRENT_DICT_ID
+    assert decompress_text(data) == value
+
+def test_decompress_uses_stored_dictionary_id(monkeypatch):
+    data = compress_text("Confidential Information shall not be disclosed.")
+    monkeypatch.setitem(CHUNK_ZDICTS, CURRENT_DICT_ID + 1, b"a different dictionary")
+    monkeypatch.setattr("text_storage.CURRENT_DICT_ID", CURRENT_DICT_ID + 1)
+    assert decompress_text(data) == "Confidential Information shall not be disclosed."
+
+def test_decompress_rejects_unknown_dictionary():
+    with pytest.raises(ValueError):
+        decompress_text(bytes([255]) + compress_text("text")[1:])
+
+@pytest.mark.parametrize("length", [150, 200])
+def test_make_snippet_boundaries(length):
+    assert make_snippet("x" * (length - 1), length) == "x" * (length - 1)
+    assert make_snippet("x" * length, length) == "x" * length
+    assert make_snippet("x" * (length + 1), length) == "x" * length + "..."
+
+def test_snippet_then_clause_matches_full_text_truncation():
+    for size in [149, 150, 151, 200, 201, 500]:
+        value = "y" * size
+        assert make_snippet(make_snippet(value), 150) == make_snippet(value, 150)
+
+def test_pack_chunk_text_skips_compression_when_snippet_is_full_text():
+    assert pack_chunk_text("x" * 200) == (None, "x" * 200)
+    text_compressed, snippet = pack_chunk_text("x" * 201)
+    assert decompress_text(text_compressed) == "x" * 201
+    assert snippet == "x" * 200 + "..."
+
+def test_chunk_row_text_prefers_compressed_and_falls_back_to_legacy():
+    compressed = SimpleNamespace(text_chunk=None, text_compressed=compress_text("new row"), snippet="new...")
+    legacy = SimpleNamespace(text_chunk="old row", text_compressed=None, snippet=None)
+    short = SimpleNamespace(text_chunk=None, text_compressed=None, snippet="short row")
+    assert chunk_row_text(compressed) == "new row"
+    assert chunk_row_text(legacy) == "old row"
+    assert chunk_row_text(short) == "short row"
+
+def test_chunk_row_snippet_falls_back_to_legacy_text():
+    assert chunk_row_snippet(SimpleNamespace(snippet="stored", text_chunk=None)) == "stored"
+    assert chunk_row_snippet(SimpleNamespace(snippet=None, text_chunk="z" * 300)) == "z" * 200 + "..."
+
+def test_detect_insights():
+    insights = detect_insights("Either party may TERMINATE. Payment is due monthly.")
+    assert [insight["type"] for insight in insights] == ["termination", "payment"]
+    assert detect_insights("Nothing relevant here.") == []
+
+LEGACY_TEXTS = ["Liability is limited to the fees paid. " * 10, "Fees are due monthly."]
+
+def build_legacy_database(path):
+    user_id, doc_id = uuid.uuid4().hex, uuid.uuid4().hex
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO users VALUES (?, 'legacy', 'x', NULL)", (user_id,))
+    conn.execute("INSERT INTO documents (doc_id, user_id, filename) VALUES (?, ?, 'a.txt')", (doc_id, user_id))
+    for i in range(5):
+        conn.execute(
+            "INSERT INTO chunks VALUES (?, ?, ?, ?, '[0.1, 0.2, 0.3, 0.4]', '{\"page\": 1}')",
+            (uuid.uuid4().hex, doc_id, user_id, LEGACY_TEXTS[i % 2])
+        )
+    conn.commit()
+    conn.close()
+
+def test_create_tables_migrates_legacy_sqlite_database(database_module, sqlite_database):
+    database = database_module
+    build_legacy_database(sqlite_database)
+
+    database.create_tables()
+    database.backfill_chunks(batch_size=2)
+
+    text_chunk = next(column for column in inspect(database.engine).get_columns("chunks") if column["name"] == "text_chunk")
+    assert text_chunk["nullable"]
+
+    db = database.SessionLocal()
+    chunks = db.query(database.Chunk).all()
+    assert len(chunks) == 5
+    for chunk in chunks:
+        assert chunk.text_chunk is None
+        assert chunk_row_text(chunk) in LEGACY_TEXTS
+        assert chunk.snippet == make_snippet(chunk_row_text(chunk))
+    assert sum(chunk.text_compressed is None for chunk in chunks) == 2
+    document = db.query(database.Document).one()
+    assert [insight["type"] for insight in json.loads(document.insights)] == ["liability"]
+
+    # New rows no longer set text_chunk
+    text_compressed, snippet = pack_chunk_text("new")
+    db.add(database.Chunk(
+        doc_id=document.doc_id, user_id=document.user_id, text_compressed=text_compressed, snippet=snippet
+    ))
+    db.commit()
+    db.close()
+
+    # Running the migration again is a no-op
+    database.create_tables()
+
+def test_create_tables_finishes_interrupted_sqlite_rebuild(database_module, sqlite_database):
+    database = database_module
+    build_legacy_database(sqlite_database)
+    # A rebuild that died right after renaming the table
+    conn = sqlite3.connect(sqlite_database)
+    conn.execute("ALTER TABLE documents ADD COLUMN insights TEXT")
+    conn.execute("ALTER TABLE chunks RENAME TO chunks_legacy")
+    conn.commit()
+    conn.close()
+
+    # The server came up on an empty chunks table and took an upload before the next migration
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    document = db.query(database.Document).one()
+    db.add(database.Chunk(doc_id=document.doc_id, user_id=document.user_id, snippet="new upload"))
+    db.commit()
+    db.close()
+
+    database.create_tables()
+
+    assert "chunks_legacy" not in inspect(database.engine).get_table_names()
+    db = database.SessionLocal()
+    texts = sorted(chunk_row_text(chunk) for chunk in db.query(database.Chunk).all())
+    db.close()
+    assert texts == sorted(LEGACY_TEXTS * 2 + [LEGACY_TEXTS[0], "new upload"])
+
+def test_contract_detail_serves_rows_not_yet_backfilled(database_module, sqlite_database):
+    database = database_module
+    from main import get_contract_detail
+
+    database.create_tables()
+    db = database.SessionLocal()
+    user = database.User(username="legacy", password_hash="x")
+    db.add(user)
+    db.commit()
+    document = database.Document(user_id=user.user_id, filename="a.txt", contract_name="a.txt")
+    db.add(document)
+    db.commit()
+    legacy_text = "Either party may terminate this Agreement on notice. " * 5
+    db.add(database.Chunk(
+        doc_id=document.doc_id, user_id=user.user_id, text_chunk=legacy_text, chunk_metadata='{"page": 4}'
+    ))
+    db.commit()
+
+    detail = asyncio.run(get_contract_detail(document.doc_id, current_user=user, db=db))
+
+    assert detail["clauses"][0]["text"] == make_snippet(legacy_text, 150)
+    assert detail["evidence"][0] == {"source": "Page 4", "snippet": make_snippet(legacy_text), "relevance": 0.9}
+    assert [insight["type"] for insight in detail["insights"]] == ["termination"]
+    db.refresh(document)
+    assert json.loads(document.insights) == detail["insights"]
+    db.close()
@@ -0,0 +1,98 @@
+"""
+Chunk text storage helpers for Contracts SaaS
+Compression, display snippets and contract insights
+"""
+
+import zlib
+
+SNIPPET_LENGTH = 200
+
+# Compressed chunk text starts with one byte naming the zlib preset dictionary
+# it was written with. Dictionaries are part of the on-disk format: never edit
+# one, add it under a new id and point CURRENT_DICT_ID at it.
+CHUNK_ZDICTS = {
+    1: (
+        b"IN WITNESS WHEREOF, the parties have executed this Agreement as of the date first written above. "
+        b"This Agreement constitutes the entire agreement between the parties and supersedes all prior "
+        b"agreements, understandings and representations. No amendment shall be effective unless in writing "
+        b"and signed by both parties. Neither party may assign this Agreement without the prior written "
+        b"consent of the other party. Notices shall be given in writing and delivered by hand, courier or email. "
+        b"Force Majeure: neither party shall be liable for any failure or delay caused by events beyond its "
+        b"reasonable control. The receiving party shall hold the disclosing party's Confidential Information "
+        b"in strict confidence and shall not disclose it to any third party. Each party shall indemnify, defend "
+        b"and hold harmless the other party from and against any claims, losses, damages, liabilities, costs "
+        b"and expenses, including reasonable attorneys' fees. Except as expressly provided, in no event shall "
+        b"either party be liable for any indirect, incidental, special, punitive or consequential damages, "
+        b"including loss of profits, revenue or data. All intellectual property rights, including patents, "
+        b"copyrights, trademarks and trade secrets, shall remain the sole property of the owner. "
+        b"The Service Provider warrants that the services will be performed in a professional and "
+        b"workmanlike manner. This Agreement may be terminated by either party for material breach upon "
+        b"thirty (30) days written notice if the breach is not cured. Upon termination or expiration, "
+        b"all outstanding fees and invoices shall become due and payable. The Customer shall pay all "
+        b"undisputed amounts within the payment period, and interest shall accrue on late payments. "
+        b"This Agreement shall be governed by and construed in accordance with the laws of the State of "
+        b"Delaware, and the courts located therein shall have exclusive jurisdiction. The term of this "
+        b"Agreement shall commence on the Effective Date and continue for an initial term, after which it "
+        b"shall automatically renew for successive renewal terms unless either party gives notice of "
+        b"non-renewal. Licensor grants Licensee a non-exclusive, non-transferable license to use the Software. "
+        b"Employee agrees to comply with all company policies, including confidentiality and non-compete "
+        b"obligations. Vendor shall deliver the goods in accordance with the specifications and delivery "
+        b"schedule. Governing Law. Termination. Confidentiality. Limitation of Liability. Indemnification. "
+        b"Payment Terms. Warranties. Term and Renewal. Compensation and Benefits. Service Level Agreement. "
+        b"the Company, the Customer, the Vendor, the Employee, the Licensor, the Licensee, the parties, "
+        b"shall not, shall be, in accordance with, pursuant to, provided that, including but not limited to, "
+        b"this Agreement, the Agreement, written notice, "
+    ),
+}
+CURRENT_DICT_ID = 1
+
+# (keyword, insight type, insight text) checked against a contract's full text
+INSIGHT_RULES = [
+    ("terminate", "termination", "Contract contains termination clauses - review notice periods"),
+    ("liability", "liability", "Liability limitations found - verify coverage adequacy"),
+    ("confidential", "confidentiality", "Confidentiality obligations present - ensure compliance"),
+    ("payment", "payment", "Payment terms specified - monitor due dates"),
+]
+
+def compress_text(value: str, dict_id: int = CURRENT_DICT_ID) -> bytes:
+    compressor = zlib.compressobj(level=9, zdict=CHUNK_ZDICTS[dict_id])
+    return bytes([dict_id]) + compressor.compress(value.encode("utf-8")) + compressor.flush()
+
+def decompress_text(data: bytes) -> str:
+    dict_id = data[0]
+    if dict_id not in CHUNK_ZDICTS:
+        raise ValueError(f"Unknown chunk compression dictionary: {dict_id}")
+    decompressor = zlib.decompressobj(zdict=CHUNK_ZDICTS[dict_id])
+    return (decompressor.decompress(data[1:]) + decompressor.flush()).decode("utf-8")
+
+def make_snippet(value: str, length: int = SNIPPET_LENGTH) -> str:
+    return value[:length] + "..." if len(value) > length else value
+
+def pack_chunk_text(value: str) -> tuple:
+    """(text_compressed, snippet) for a chunk; short chunks are stored as their snippet alone"""
+    snippet = make_snippet(value)
+    if snippet == value:
+        return None, snippet
+    return compress_text(value), snippet
+
+def chunk_row_text(row) -> str:
+    """Full text of a chunk row: compressed, legacy uncompressed or snippet-only"""
+    if row.text_compressed is not None:
+        return decompress_text(row.text_compressed)
+    if row.text_chunk is not None:
+        return row.text_chunk
+    return row.snippet
+
+def chunk_row_snippet(row) -> str:
+    """Snippet of a chunk row, built from legacy text if the row has not been backfilled yet"""
+    if row.snippet is not None:
+        return row.snippet
+    return make_snippet(row.text_chunk)
+
+def detect_insights(text: str) -> list:
+    lowered = text.lower()
+    return [
+        {"type": insight_type, "text": insight_text}
+        for keyword, insight_type, insight_text in INSIGHT_RULES
+        if keyword in lowered
+    ]